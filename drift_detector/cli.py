@@ -6,9 +6,6 @@ import logging
 import os
 import sys
 
-from drift_detector.get_state import run_get_state
-from drift_detector.get_drift import run_get_drift
-
 def setup_logging(verbose):
     """Configure logging based on verbosity level."""
     log_level = logging.DEBUG if verbose else logging.INFO
@@ -24,37 +21,17 @@ def validate_path(path):
         raise argparse.ArgumentTypeError(f"Path '{path}' does not exist")
     return path
 
-def parse_args():
-    """Parse command line arguments."""
-    parser = argparse.ArgumentParser(
-        description="Tool for managing cartography state files and detecting infrastructure drift"
-    )
-    
-    parser.add_argument(
-        "-v", "--verbose", 
-        action="store_true", 
-        help="Enable verbose logging"
-    )
-    
-    subparsers = parser.add_subparsers(dest="command", help="Commands")
-    
-    # Get-State command
-    get_state_parser = subparsers.add_parser(
-        "get-state", 
-        help="Get cartography state files"
-    )
+def _add_get_state_arguments(get_state_parser):
+    """Add the arguments of the get-state command."""
     get_state_parser.add_argument(
         "--path", 
         type=validate_path,
         required=True,
         help="Path to the parent directory containing 'drift-detect-archive' folder"
     )
-    
-    # Get-Drift command
-    get_drift_parser = subparsers.add_parser(
-        "get-drift", 
-        help="Detect drift in cartography state files"
-    )
+
+def _add_get_drift_arguments(get_drift_parser):
+    """Add the arguments of the get-drift command."""
     get_drift_parser.add_argument(
         "--path", 
         type=validate_path,
@@ -66,8 +43,40 @@ def parse_args():
         type=str,
         help="Output file path to save consolidated drift data (JSON format)"
     )
+
+# Command name -> (help text, function adding the command's arguments)
+_COMMANDS = {
+    "get-state": ("Get cartography state files", _add_get_state_arguments),
+    "get-drift": ("Detect drift in cartography state files", _add_get_drift_arguments),
+}
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    if argv is None:
+        argv = sys.argv[1:]
+    
+    parser = argparse.ArgumentParser(
+        description="Tool for managing cartography state files and detecting infrastructure drift"
+    )
+    
+    parser.add_argument(
+        "-v", "--verbose", 
+        action="store_true", 
+        help="Enable verbose logging"
+    )
     
-    return parser.parse_args()
+    subparsers = parser.add_subparsers(dest="command", help="Commands")
+    
+    # Only the options (-v, -h) can precede the command, so the first positional
+    # argument selects it. Every command is registered for the top-level help,
+    # but only the selected one gets its arguments.
+    selected_command = next((arg for arg in argv if not arg.startswith("-")), None)
+    for command, (help_text, add_arguments) in _COMMANDS.items():
+        command_parser = subparsers.add_parser(command, help=help_text)
+        if command == selected_command:
+            add_arguments(command_parser)
+    
+    return parser.parse_args(argv)
 
 def main():
     """Main entry point for the CLI."""
@@ -81,23 +90,30 @@ def main():
     logger = logging.getLogger(__name__)
     
     try:
+        # Command modules are imported on demand so that --help and the other
+        # command do not pay for importing the unused module graph
         if args.command == "get-state":
+            from drift_detector.get_state import run_get_state
+            
             logger.info("Running Get-State module")
             run_get_state(args.path)
             logger.info("Get-State operation completed successfully")
             
         elif args.command == "get-drift":
+            import json
+            from drift_detector.get_drift import run_get_drift
+            from drift_detector.utils import write_json_file
+            
             logger.info("Running Get-Drift module")
             drift_data = run_get_drift(args.path)
             
             if args.output:
-                import json
-                with open(args.output, 'w') as f:
-                    json.dump(drift_data, f, indent=2)
+                write_json_file(drift_data, args.output)
                 logger.info(f"Drift data saved to {args.output}")
             else:
-                import json
-                print(json.dumps(drift_data, indent=2))
+                # Stream the encoded chunks instead of building the whole document in memory
+                json.dump(drift_data, sys.stdout, indent=2)
+                sys.stdout.write("\n")
             
             logger.info("Get-Drift operation completed successfully")
             
@@ -8,13 +8,22 @@ import json
 import logging
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from dotenv import load_dotenv
+from functools import lru_cache, partial
 
 from drift_detector.utils import (
+    check_drift_detect_archive_folder, 
     ensure_directory_exists, 
-    is_timestamp_file, 
-    run_command
+    find_new_file, 
+    get_file_names, 
+    get_files, 
+    get_subfolders, 
+    get_timestamp_files, 
+    read_json_file, 
+    run_command, 
+    worker_count, 
+    write_json_file
 )
 
 logger = logging.getLogger(__name__)
@@ -39,45 +48,6 @@ def check_drift_detect_folder(base_path):
     logger.debug(f"Found drift-detect folder at {drift_detect_path}")
     return drift_detect_path
 
-def check_drift_detect_archive_folder(base_path):
-    """
-    Check if the drift-detect-archive folder exists at the specified path.
-    
-    Args:
-        base_path (str): Base path where drift-detect-archive folder should exist
-        
-    Returns:
-        str: Path to the drift-detect-archive folder
-    
-    Raises:
-        FileNotFoundError: If drift-detect-archive folder is not found
-    """
-    drift_detect_archive_path = os.path.join(base_path, "drift-detect-archive")
-    if not os.path.isdir(drift_detect_archive_path):
-        raise FileNotFoundError(f"Directory 'drift-detect-archive' not found at {base_path}")
-    
-    logger.debug(f"Found drift-detect-archive folder at {drift_detect_archive_path}")
-    return drift_detect_archive_path
-
-def get_subfolders(folder_path):
-    """
-    Get list of subfolders within the specified folder.
-    
-    Args:
-        folder_path (str): Path to folder
-        
-    Returns:
-        list: List of subfolder paths
-    """
-    subfolders = []
-    for item in os.listdir(folder_path):
-        item_path = os.path.join(folder_path, item)
-        if os.path.isdir(item_path):
-            subfolders.append(item_path)
-    
-    logger.debug(f"Found {len(subfolders)} subfolders in {os.path.basename(folder_path)}")
-    return subfolders
-
 def ensure_subfolder_in_archive(drift_detect_archive_path, subfolder_name):
     """
     Ensure a subfolder exists in the drift-detect-archive folder.
@@ -109,47 +79,54 @@ def ensure_drift_archive_folder(subfolder_path):
     logger.debug(f"Ensured drift_archive folder exists at {drift_archive_path}")
     return drift_archive_path
 
-def get_timestamp_files(subfolder_path):
+def move_timestamp_file_to_archive(source_path, archive_subfolder_path):
     """
-    Get list of timestamp-formatted JSON files in the subfolder.
+    Move a timestamp file to the archive subfolder.
     
     Args:
-        subfolder_path (str): Path to subfolder
+        source_path (str): Path to source timestamp file
+        archive_subfolder_path (str): Path to archive subfolder
         
     Returns:
-        list: List of timestamp file paths sorted by timestamp (oldest first)
+        str: Path to the moved file in archive
     """
-    timestamp_files = []
-    
-    for file_name in os.listdir(subfolder_path):
-        file_path = os.path.join(subfolder_path, file_name)
-        if os.path.isfile(file_path) and is_timestamp_file(file_name):
-            timestamp_files.append((file_name, file_path))
+    file_name = os.path.basename(source_path)
+    dest_path = os.path.join(archive_subfolder_path, file_name)
     
-    # Sort by filename (which is a timestamp) in ascending order
-    timestamp_files.sort()
+    # Only the file contents and timestamps are needed in the archive, so skip the
+    # permission and extended-attribute replication that shutil.copy2 performs
+    shutil.copyfile(source_path, dest_path)
+    source_stat = os.stat(source_path)
+    os.utime(dest_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Copied {file_name} to {os.path.basename(archive_subfolder_path)}")
     
-    return [file_path for _, file_path in timestamp_files]
+    return dest_path
 
-def move_timestamp_file_to_archive(source_path, archive_subfolder_path):
+def move_drift_file_to_archive(source_path, drift_archive_path):
     """
-    Move a timestamp file to the archive subfolder.
+    Move a drift file to the drift_archive folder.
     
     Args:
-        source_path (str): Path to source timestamp file
-        archive_subfolder_path (str): Path to archive subfolder
+        source_path (str): Path to drift file
+        drift_archive_path (str): Path to drift_archive folder
         
     Returns:
-        str: Path to the moved file in archive
+        str: Path to the moved file in drift_archive
     """
     file_name = os.path.basename(source_path)
-    dest_path = os.path.join(archive_subfolder_path, file_name)
+    dest_path = os.path.join(drift_archive_path, file_name)
     
-    shutil.copy2(source_path, dest_path)
-    logger.info(f"Copied {file_name} to {os.path.basename(archive_subfolder_path)}")
+    shutil.move(source_path, dest_path)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Moved {file_name} to drift_archive folder")
     
     return dest_path
 
+def _is_drift_file(file_name):
+    """Check if file name is the name of a drift file written by cartography."""
+    return file_name.startswith("drift_")
+
 def move_existing_drift_files(subfolder_path, drift_archive_path):
     """
     Move existing drift files to drift_archive folder.
@@ -158,12 +135,14 @@ def move_existing_drift_files(subfolder_path, drift_archive_path):
         subfolder_path (str): Path to subfolder
         drift_archive_path (str): Path to drift_archive folder
     """
-    for file_name in os.listdir(subfolder_path):
-        if file_name.startswith("drift_") and os.path.isfile(os.path.join(subfolder_path, file_name)):
-            source_path = os.path.join(subfolder_path, file_name)
-            dest_path = os.path.join(drift_archive_path, file_name)
-            shutil.move(source_path, dest_path)
-            logger.info(f"Moved {file_name} to drift_archive folder")
+    moved_files = [
+        move_drift_file_to_archive(drift_file, drift_archive_path)
+        for _, drift_file in get_files(subfolder_path, _is_drift_file)
+    ]
+    
+    if moved_files:
+        logger.info(f"Moved {len(moved_files)} drift files in {os.path.basename(subfolder_path)} to drift_archive folder: "
+                    f"{', '.join(os.path.basename(path) for path in moved_files)}")
 
 def run_cartography_detect_drift(subfolder_path, start_time_file, end_time_file):
     """
@@ -190,26 +169,26 @@ def run_cartography_detect_drift(subfolder_path, start_time_file, end_time_file)
     logger.info(f"Running cartography detect-drift for {os.path.basename(subfolder_path)}")
     return run_command(command)
 
-def find_new_drift_file(subfolder_path):
+@lru_cache(maxsize=1)
+def _pocketbase_credentials():
     """
-    Find newly created drift file.
+    Load PocketBase credentials from the environment and .env file.
+    
+    The .env file is only read on the first call; later calls reuse the result.
     
-    Args:
-        subfolder_path (str): Path to subfolder
-        
     Returns:
-        str or None: Path to new drift file if found, None otherwise
+        tuple: (url, username, password), with None for any missing value
     """
-    for file_name in os.listdir(subfolder_path):
-        if file_name.startswith("drift_") and os.path.isfile(os.path.join(subfolder_path, file_name)):
-            # Check if file was created recently (within last minute)
-            file_path = os.path.join(subfolder_path, file_name)
-            if datetime.now().timestamp() - os.path.getctime(file_path) < 60:
-                logger.info(f"Found new drift file: {file_name}")
-                return file_path
-    
-    logger.warning("No new drift file was created")
-    return None
+    # Imported here as this is the only user of python-dotenv
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+    
+    return (
+        os.environ.get("POCKETBASE_URL"),
+        os.environ.get("POCKETBASE_USERNAME"),
+        os.environ.get("POCKETBASE_PASSWORD")
+    )
 
 def push_to_pocketbase(drift_data):
     """
@@ -222,13 +201,8 @@ def push_to_pocketbase(drift_data):
         bool: True if successful, False otherwise
     """
     try:
-        # Load environment variables from .env file
-        load_dotenv()
-        
         # Check if PocketBase credentials exist
-        pocketbase_url = os.environ.get("POCKETBASE_URL")
-        pocketbase_username = os.environ.get("POCKETBASE_USERNAME")
-        pocketbase_password = os.environ.get("POCKETBASE_PASSWORD")
+        pocketbase_url, pocketbase_username, pocketbase_password = _pocketbase_credentials()
         
         if not pocketbase_url or not pocketbase_username or not pocketbase_password:
             logger.error("Missing PocketBase credentials in .env file")
@@ -243,6 +217,51 @@ def push_to_pocketbase(drift_data):
         logger.error(f"Error pushing data to PocketBase: {str(e)}")
         return False
 
+def archive_drift_detect_subfolder(subfolder_path, drift_detect_archive_path):
+    """
+    Move the timestamp files of a drift-detect subfolder to drift-detect-archive.
+    
+    Args:
+        subfolder_path (str): Path to subfolder in drift-detect
+        drift_detect_archive_path (str): Path to drift-detect-archive folder
+        
+    Returns:
+        str or None: Path to the archive subfolder if it now contains exactly 2 timestamp
+            files, None otherwise
+    """
+    subfolder_name = os.path.basename(subfolder_path)
+    logger.info(f"Checking subfolder {subfolder_name} in drift-detect")
+    
+    # Get timestamp files in the subfolder
+    timestamp_files = get_timestamp_files(subfolder_path)
+    
+    if not timestamp_files:
+        logger.warning(f"No timestamp files found in {subfolder_name}")
+        return None
+    
+    # Ensure corresponding subfolder exists in drift-detect-archive
+    archive_subfolder_path = ensure_subfolder_in_archive(drift_detect_archive_path, subfolder_name)
+    
+    # Move timestamp files to archive subfolder. Subfolders are already handled
+    # concurrently and each holds only a few files, so they are copied one by one.
+    copied_files = [
+        move_timestamp_file_to_archive(timestamp_file, archive_subfolder_path)
+        for timestamp_file in timestamp_files
+    ]
+    logger.info(f"Copied {len(copied_files)} timestamp files to {subfolder_name} in drift-detect-archive: "
+                f"{', '.join(os.path.basename(path) for path in copied_files)}")
+    
+    # More than 2 copied files means the archive cannot hold exactly 2, so skip rescanning it
+    if len(timestamp_files) > 2:
+        return None
+    
+    # Check if archive subfolder now has exactly 2 timestamp files
+    archive_timestamp_files = get_timestamp_files(archive_subfolder_path, limit=3)
+    if len(archive_timestamp_files) == 2:
+        return archive_subfolder_path
+    
+    return None
+
 def process_drift_detect_subfolders(drift_detect_path, drift_detect_archive_path, consolidated_drift_data):
     """
     Process subfolders in drift-detect and move timestamp files to drift-detect-archive.
@@ -256,46 +275,32 @@ def process_drift_detect_subfolders(drift_detect_path, drift_detect_archive_path
         dict: Dictionary mapping subfolder names to their corresponding archive subfolders 
              that contain exactly 2 timestamp files
     """
-    subfolders_to_process = {}
-    
     # Get all subfolders in drift-detect
     drift_detect_subfolders = get_subfolders(drift_detect_path)
     
-    for subfolder_path in drift_detect_subfolders:
-        subfolder_name = os.path.basename(subfolder_path)
-        logger.info(f"Checking subfolder {subfolder_name} in drift-detect")
-        
-        # Get timestamp files in the subfolder
-        timestamp_files = get_timestamp_files(subfolder_path)
-        
-        if not timestamp_files:
-            logger.warning(f"No timestamp files found in {subfolder_name}")
-            continue
-        
-        # Ensure corresponding subfolder exists in drift-detect-archive
-        archive_subfolder_path = ensure_subfolder_in_archive(drift_detect_archive_path, subfolder_name)
-        
-        # Move timestamp files to archive subfolder
-        for timestamp_file in timestamp_files:
-            move_timestamp_file_to_archive(timestamp_file, archive_subfolder_path)
-        
-        # Check if archive subfolder now has exactly 2 timestamp files
-        archive_timestamp_files = get_timestamp_files(archive_subfolder_path)
-        if len(archive_timestamp_files) == 2:
-            subfolders_to_process[subfolder_name] = archive_subfolder_path
-    
-    return subfolders_to_process
+    # Each subfolder only touches its own archive subfolder, so their directory scans
+    # and copies are issued concurrently rather than one subfolder at a time
+    with ThreadPoolExecutor(max_workers=worker_count(len(drift_detect_subfolders))) as executor:
+        archive_subfolder_paths = list(executor.map(
+            partial(archive_drift_detect_subfolder, drift_detect_archive_path=drift_detect_archive_path),
+            drift_detect_subfolders
+        ))
+    
+    return {
+        os.path.basename(archive_subfolder_path): archive_subfolder_path
+        for archive_subfolder_path in archive_subfolder_paths
+        if archive_subfolder_path is not None
+    }
 
-def process_archive_subfolder(archive_subfolder_path, consolidated_drift_data):
+def process_archive_subfolder(archive_subfolder_path):
     """
     Process a subfolder in drift-detect-archive for drift detection.
     
     Args:
         archive_subfolder_path (str): Path to subfolder in drift-detect-archive
-        consolidated_drift_data (dict): Dictionary to store consolidated drift data
         
     Returns:
-        bool: True if successful, False otherwise
+        tuple: (subfolder_name, drift_data) where drift_data is None if no drift data was collected
     """
     subfolder_name = os.path.basename(archive_subfolder_path)
     logger.info(f"Processing archive subfolder: {subfolder_name}")
@@ -304,50 +309,53 @@ def process_archive_subfolder(archive_subfolder_path, consolidated_drift_data):
     drift_archive_path = ensure_drift_archive_folder(archive_subfolder_path)
     
     # Get timestamp files
-    timestamp_files = get_timestamp_files(archive_subfolder_path)
+    timestamp_files = get_timestamp_files(archive_subfolder_path, limit=3)
     
     if len(timestamp_files) != 2:
+        found = "more than 2" if len(timestamp_files) > 2 else len(timestamp_files)
         logger.warning(f"Expected exactly 2 timestamp files in {subfolder_name}, "
-                      f"found {len(timestamp_files)}. Skipping.")
-        return False
+                      f"found {found}. Skipping.")
+        return subfolder_name, None
     
     # Move existing drift files to archive
     move_existing_drift_files(archive_subfolder_path, drift_archive_path)
     
+    # Usually empty after the move above, but any drift file left behind must not be
+    # mistaken for the one cartography creates
+    existing_drift_files = get_file_names(archive_subfolder_path, _is_drift_file)
+    
     # Run cartography detect-drift command
     if run_cartography_detect_drift(archive_subfolder_path, timestamp_files[0], timestamp_files[1]):
         # Find new drift file
-        new_drift_file = find_new_drift_file(archive_subfolder_path)
+        new_drift_file = find_new_file(archive_subfolder_path, existing_drift_files, _is_drift_file, "drift")
         
         if new_drift_file:
             try:
                 # Read data from drift file and add to consolidated data
-                with open(new_drift_file, 'r') as f:
-                    drift_data = json.load(f)
+                drift_data = read_json_file(new_drift_file)
                 
-                # Add to consolidated data with subfolder as key
-                consolidated_drift_data[subfolder_name] = drift_data
-                logger.info(f"Added drift data from {subfolder_name} to consolidated data")
-                return True
+                return subfolder_name, drift_data
             
             except json.JSONDecodeError:
                 logger.error(f"Error parsing JSON from {new_drift_file}")
             except Exception as e:
                 logger.error(f"Error processing drift file: {str(e)}")
     
-    return False
+    return subfolder_name, None
 
 def run_get_drift(base_path):
     """
     Run the Get_Drift module logic.
     
     Args:
-        base_path (str): Base path where drift-detect and drift-detect-archive folders should exist
+        base_path (str or os.PathLike): Base path where drift-detect and drift-detect-archive folders should exist
         
     Returns:
         dict: Consolidated drift data
     """
     consolidated_drift_data = {}
+    # Normalise path-like inputs once so every derived path and the report metadata are plain strings
+    base_path = os.fspath(base_path)
     
     try:
         # Check if both required folders exist
@@ -363,11 +371,16 @@ def run_get_drift(base_path):
             logger.warning("No subfolders with exactly 2 timestamp files found")
             return consolidated_drift_data
         
-        # Process each subfolder in drift-detect-archive that has exactly 2 timestamp files
+        # Process each subfolder in drift-detect-archive that has exactly 2 timestamp files.
+        # map yields results in submission order, so the merged report is deterministic.
         success_count = 0
-        for subfolder_name, archive_subfolder_path in subfolders_to_process.items():
-            if process_archive_subfolder(archive_subfolder_path, consolidated_drift_data):
-                success_count += 1
+        with ThreadPoolExecutor(max_workers=worker_count(len(subfolders_to_process))) as executor:
+            results = executor.map(process_archive_subfolder, subfolders_to_process.values())
+            for subfolder_name, drift_data in results:
+                if drift_data is not None:
+                    consolidated_drift_data[subfolder_name] = drift_data
+                    logger.info(f"Added drift data from {subfolder_name} to consolidated data")
+                    success_count += 1
         
         logger.info(f"Successfully processed {success_count} out of {len(subfolders_to_process)} subfolders")
         
@@ -381,8 +394,7 @@ def run_get_drift(base_path):
         
         # Save consolidated drift data to file
         drift_report_path = os.path.join(base_path, "drift_report.json")
-        with open(drift_report_path, 'w') as f:
-            json.dump(consolidated_drift_data, f, indent=2)
+        write_json_file(consolidated_drift_data, drift_report_path)
         logger.info(f"Saved consolidated drift data to {drift_report_path}")
         
         # Push data to PocketBase
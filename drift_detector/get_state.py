@@ -4,58 +4,28 @@ Module for retrieving and managing cartography state files.
 This module looks for "drift-detect-archive" folder, checks for subfolders,
 handles JSON files with timestamp names, and runs cartography get-state commands.
 """
+import errno
 import logging
 import os
 import shutil
-import subprocess
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 from drift_detector.utils import (
+    check_drift_detect_archive_folder, 
     ensure_directory_exists, 
+    find_new_file, 
+    get_file_names, 
+    get_files, 
+    get_subfolders, 
     is_timestamp_file, 
-    run_command
+    run_command, 
+    worker_count
 )
 
 logger = logging.getLogger(__name__)
 
-def check_drift_detect_archive_folder(base_path):
-    """
-    Check if the drift-detect-archive folder exists at the specified path.
-    
-    Args:
-        base_path (str): Base path where drift-detect-archive folder should exist
-        
-    Returns:
-        str: Path to the drift-detect-archive folder
-    
-    Raises:
-        FileNotFoundError: If drift-detect-archive folder is not found
-    """
-    drift_detect_archive_path = os.path.join(base_path, "drift-detect-archive")
-    if not os.path.isdir(drift_detect_archive_path):
-        raise FileNotFoundError(f"Directory 'drift-detect-archive' not found at {base_path}")
-    
-    logger.debug(f"Found drift-detect-archive folder at {drift_detect_archive_path}")
-    return drift_detect_archive_path
-
-def get_subfolders(drift_detect_archive_path):
-    """
-    Get list of subfolders within the drift-detect-archive folder.
-    
-    Args:
-        drift_detect_archive_path (str): Path to drift-detect-archive folder
-        
-    Returns:
-        list: List of subfolder paths
-    """
-    subfolders = []
-    for item in os.listdir(drift_detect_archive_path):
-        item_path = os.path.join(drift_detect_archive_path, item)
-        if os.path.isdir(item_path):
-            subfolders.append(item_path)
-    
-    logger.debug(f"Found {len(subfolders)} subfolders in drift-detect-archive")
-    return subfolders
+# Whether renames relative to open directory descriptors are available (not on Windows)
+_DIR_FD_RENAME_SUPPORTED = hasattr(os, "O_DIRECTORY") and os.rename in os.supports_dir_fd
 
 def ensure_state_archive_folder(drift_detect_archive_path):
     """
@@ -69,9 +39,35 @@ def ensure_state_archive_folder(drift_detect_archive_path):
     """
     state_archive_path = os.path.join(drift_detect_archive_path, "state-archive")
     ensure_directory_exists(state_archive_path)
-    logger.debug(f"Ensured state-archive folder exists at {state_archive_path}")
+    logger.debug("Ensured state-archive folder exists at %s", state_archive_path)
     return state_archive_path
 
+def move_to_state_archive(file_name, file_path, state_archive_path, src_dir_fd=None, dst_dir_fd=None):
+    """
+    Move a timestamp file to the state-archive folder.
+    
+    Args:
+        file_name (str): Name of the timestamp file
+        file_path (str): Path to the timestamp file
+        state_archive_path (str): Path to state-archive folder
+        src_dir_fd (int, optional): Open descriptor of the folder containing the file
+        dst_dir_fd (int, optional): Open descriptor of the state-archive folder
+    """
+    archive_file_path = os.path.join(state_archive_path, file_name)
+    try:
+        # state-archive normally lives on the same filesystem, making this a single rename.
+        # With directory descriptors the rename resolves only the file name; this is only
+        # used on POSIX, where os.rename replaces an existing target just like os.replace.
+        if src_dir_fd is not None and dst_dir_fd is not None:
+            os.rename(file_name, file_name, src_dir_fd=src_dir_fd, dst_dir_fd=dst_dir_fd)
+        else:
+            os.replace(file_path, archive_file_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(file_path, archive_file_path)
+    logger.info("Moved %s to state-archive folder", file_name)
+
 def handle_existing_timestamp_files(drift_detect_archive_path, state_archive_path):
     """
     Check for existing timestamp files in the main drift-detect-archive folder and move older ones to state-archive.
@@ -80,23 +76,32 @@ def handle_existing_timestamp_files(drift_detect_archive_path, state_archive_pat
         drift_detect_archive_path (str): Path to the main drift-detect-archive folder
         state_archive_path (str): Path to state-archive folder
     """
-    timestamp_files = []
+    timestamp_files = get_files(drift_detect_archive_path, is_timestamp_file)
+    
+    # Keep the most recent file (filenames are timestamps), move others to state-archive.
+    # Only the maximum is needed, so a linear scan replaces sorting the whole list.
+    most_recent = max(timestamp_files, default=None)
+    files_to_archive = [timestamp_file for timestamp_file in timestamp_files if timestamp_file != most_recent]
     
-    for file_name in os.listdir(drift_detect_archive_path):
-        file_path = os.path.join(drift_detect_archive_path, file_name)
-        if os.path.isfile(file_path) and is_timestamp_file(file_name):
-            timestamp_files.append((file_name, file_path))
+    if not files_to_archive:
+        return
     
-    # Sort by filename (which is a timestamp) in descending order
-    timestamp_files.sort(reverse=True)
+    if not _DIR_FD_RENAME_SUPPORTED:
+        for file_name, file_path in files_to_archive:
+            move_to_state_archive(file_name, file_path, state_archive_path)
+        return
     
-    # Keep the most recent file, move others to state-archive
-    if len(timestamp_files) > 0:
-        for i, (file_name, file_path) in enumerate(timestamp_files):
-            if i > 0:  # Skip the first (most recent) file
-                archive_file_path = os.path.join(state_archive_path, file_name)
-                shutil.move(file_path, archive_file_path)
-                logger.info(f"Moved {file_name} to state-archive folder")
+    # Open both folders once so each rename does not walk the full path prefix again
+    src_dir_fd = os.open(drift_detect_archive_path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        dst_dir_fd = os.open(state_archive_path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            for file_name, file_path in files_to_archive:
+                move_to_state_archive(file_name, file_path, state_archive_path, src_dir_fd, dst_dir_fd)
+        finally:
+            os.close(dst_dir_fd)
+    finally:
+        os.close(src_dir_fd)
 
 def run_cartography_get_state(subfolder_path):
     """
@@ -111,35 +116,9 @@ def run_cartography_get_state(subfolder_path):
     subfolder_name = os.path.basename(subfolder_path)
     command = ["cartography", "get-state", subfolder_name]
     
-    logger.info(f"Running cartography get-state for {subfolder_name}")
+    logger.info("Running cartography get-state for %s", subfolder_name)
     return run_command(command)
 
-def check_state_file_created(subfolder_path):
-    """
-    Check if a new state file with timestamp format was created.
-    
-    Args:
-        subfolder_path (str): Path to subfolder
-        
-    Returns:
-        str or None: Path to new state file if found, None otherwise
-    """
-    # Get current list of timestamp files
-    new_files = []
-    for file_name in os.listdir(subfolder_path):
-        file_path = os.path.join(subfolder_path, file_name)
-        if os.path.isfile(file_path) and is_timestamp_file(file_name):
-            # Check if file was created recently (within last minute)
-            if datetime.now().timestamp() - os.path.getctime(file_path) < 60:
-                new_files.append(file_path)
-    
-    if new_files:
-        logger.info(f"Found new state file: {os.path.basename(new_files[0])}")
-        return new_files[0]
-    else:
-        logger.warning("No new state file was created")
-        return None
-
 def process_subfolder(subfolder_path):
     """
     Process a single subfolder for get-state operation.
@@ -151,10 +130,13 @@ def process_subfolder(subfolder_path):
         bool: True if successful, False otherwise
     """
     subfolder_name = os.path.basename(subfolder_path)
-    logger.info(f"Processing subfolder: {subfolder_name}")
+    logger.info("Processing subfolder: %s", subfolder_name)
+    
+    # find_new_file compares against these names to find the new state file
+    existing_state_files = get_file_names(subfolder_path, is_timestamp_file)
     
     if run_cartography_get_state(subfolder_path):
-        new_state_file = check_state_file_created(subfolder_path)
+        new_state_file = find_new_file(subfolder_path, existing_state_files, is_timestamp_file, "state")
         return new_state_file is not None
     
     return False
@@ -183,14 +165,13 @@ def run_get_state(base_path):
             logger.warning("No subfolders found in drift-detect-archive folder")
             return False
         
-        success_count = 0
-        for subfolder_path in subfolders:
-            if process_subfolder(subfolder_path):
-                success_count += 1
+        # One cartography get-state run per subfolder; sum counts the successful ones
+        with ThreadPoolExecutor(max_workers=worker_count(len(subfolders))) as executor:
+            success_count = sum(executor.map(process_subfolder, subfolders))
         
-        logger.info(f"Successfully processed {success_count} out of {len(subfolders)} subfolders")
+        logger.info("Successfully processed %d out of %d subfolders", success_count, len(subfolders))
         return success_count > 0
     
     except Exception as e:
-        logger.error(f"Error in run_get_state: {str(e)}", exc_info=True)
+        logger.error("Error in run_get_state: %s", e, exc_info=True)
         raise
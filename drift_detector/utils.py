@@ -1,13 +1,31 @@
 """
 Utility functions for the drift detector application.
 """
+import heapq
+import json
 import logging
 import os
-import subprocess
 import re
+import subprocess
+import tempfile
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; fall back to the standard library decoder
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Buffer size used when reading and writing JSON files
+_JSON_IO_BUFFER_SIZE = 64 * 1024
+
+# Runs of 19 or more digits; every integer with fewer digits fits in 64 bits
+_LONG_DIGIT_RUN_RE = re.compile(rb"\d{19,}")
+
+# Upper bound on the threads used to process subfolders concurrently
+_MAX_WORKER_THREADS = 32
+
 def ensure_directory_exists(directory_path):
     """
     Create directory if it doesn't exist.
@@ -15,9 +33,8 @@ def ensure_directory_exists(directory_path):
     Args:
         directory_path (str): Path to directory to ensure exists
     """
-    if not os.path.exists(directory_path):
-        os.makedirs(directory_path)
-        logger.debug(f"Created directory: {directory_path}")
+    # A single call that is also safe when another worker creates the directory concurrently
+    os.makedirs(directory_path, exist_ok=True)
 
 def is_timestamp_file(file_name):
     """
@@ -30,10 +47,209 @@ def is_timestamp_file(file_name):
     Returns:
         bool: True if file name matches timestamp format, False otherwise
     """
-    # Pattern matches sequences of numbers separated by dots
-    # The extension .json is optional to handle both cases
-    pattern = r"^(\d+\.){7,8}\d+(\.\w+)?$"
-    return bool(re.match(pattern, file_name))
+    # Equivalent to the pattern ^(\d+\.){7,8}\d+(\.\w+)?$ : 8 or 9 numbers separated
+    # by dots, with an optional extension (.json) to handle both cases. Checked with
+    # str methods instead of a regex since this runs for every directory entry.
+    
+    # Matching names contain 7 to 9 dots; rejecting on the count first is the cheapest
+    # path for most other files (template.json, drift files, ...)
+    if not 7 <= file_name.count(".") <= 9:
+        return False
+    
+    parts = file_name.split(".")
+    last = parts.pop()
+    if "" in parts or not "".join(parts).isdecimal():
+        return False
+    
+    # A numeric last part is either the final number or an all-digit extension
+    if last.isdecimal():
+        return True
+    
+    # Otherwise it is an extension (word characters), which needs 8 numbers before it
+    return len(parts) >= 8 and last.replace("_", "a").isalnum()
+
+def check_drift_detect_archive_folder(base_path):
+    """
+    Check if the drift-detect-archive folder exists at the specified path.
+    
+    Args:
+        base_path (str): Base path where drift-detect-archive folder should exist
+        
+    Returns:
+        str: Path to the drift-detect-archive folder
+    
+    Raises:
+        FileNotFoundError: If drift-detect-archive folder is not found
+    """
+    drift_detect_archive_path = os.path.join(base_path, "drift-detect-archive")
+    if not os.path.isdir(drift_detect_archive_path):
+        raise FileNotFoundError(f"Directory 'drift-detect-archive' not found at {base_path}")
+    
+    logger.debug("Found drift-detect-archive folder at %s", drift_detect_archive_path)
+    return drift_detect_archive_path
+
+def get_subfolders(folder_path):
+    """
+    Get list of subfolders within the specified folder.
+    
+    Args:
+        folder_path (str): Path to folder
+        
+    Returns:
+        list: List of subfolder paths
+    """
+    with os.scandir(folder_path) as entries:
+        subfolders = [entry.path for entry in entries if entry.is_dir()]
+    
+    logger.debug("Found %d subfolders in %s", len(subfolders), os.path.basename(folder_path))
+    return subfolders
+
+def get_files(folder_path, name_predicate):
+    """
+    Get the files in the folder whose names match a predicate.
+    
+    Args:
+        folder_path (str): Path to folder
+        name_predicate (callable): Function taking a file name and returning True for
+            the files to keep
+        
+    Returns:
+        list: (file name, file path) tuples, in directory order
+    """
+    with os.scandir(folder_path) as entries:
+        # The name check is cheaper than is_file, which may need a stat call
+        return [(entry.name, entry.path) for entry in entries if name_predicate(entry.name) and entry.is_file()]
+
+def get_file_names(folder_path, name_predicate):
+    """
+    Get the names of the files currently in the folder that match a predicate.
+    
+    Args:
+        folder_path (str): Path to folder
+        name_predicate (callable): Function taking a file name and returning True for
+            the files to keep
+        
+    Returns:
+        set: Names of the matching files
+    """
+    return {file_name for file_name, _ in get_files(folder_path, name_predicate)}
+
+def find_new_file(folder_path, existing_file_names, name_predicate, label):
+    """
+    Find the single matching file created since existing_file_names was captured.
+    
+    Args:
+        folder_path (str): Path to folder
+        existing_file_names (set): Matching file names present before the file was created,
+            as returned by get_file_names
+        name_predicate (callable): Function taking a file name and returning True for
+            the files to consider
+        label (str): Kind of file used in log messages, e.g. "state" or "drift"
+        
+    Returns:
+        str or None: Path to the new file if exactly one was found, None otherwise
+    """
+    new_files = get_file_names(folder_path, name_predicate) - existing_file_names
+    
+    if not new_files:
+        logger.warning("No new %s file was created in %s", label, os.path.basename(folder_path))
+        return None
+    
+    if len(new_files) > 1:
+        logger.error("Expected one new %s file in %s, found %d: %s",
+                     label, os.path.basename(folder_path), len(new_files), ", ".join(sorted(new_files)))
+        return None
+    
+    file_name = new_files.pop()
+    logger.info("Found new %s file: %s", label, file_name)
+    return os.path.join(folder_path, file_name)
+
+def get_timestamp_files(subfolder_path, limit=None):
+    """
+    Get list of timestamp-formatted JSON files in the subfolder.
+    
+    Args:
+        subfolder_path (str): Path to subfolder
+        limit (int, optional): Maximum number of files to return. Only the oldest
+            ``limit`` files are kept, avoiding a full sort of large folders; a limit
+            of 3 is enough to tell "exactly 2 files" apart from "more than 2".
+        
+    Returns:
+        list: List of timestamp file paths sorted by timestamp (oldest first)
+    """
+    timestamp_files = get_files(subfolder_path, is_timestamp_file)
+    
+    # Sort by filename (which is a timestamp) in ascending order
+    if limit is None:
+        timestamp_files.sort()
+    else:
+        timestamp_files = heapq.nsmallest(limit, timestamp_files)
+    
+    return [file_path for _, file_path in timestamp_files]
+
+def read_json_file(file_path):
+    """
+    Read and parse a JSON file, using orjson when it is installed.
+    
+    The result is the same as with the standard library: documents orjson would
+    parse differently (integers beyond 64 bits, NaN, Infinity, numbers out of the
+    float range) are left to the json module.
+    
+    Args:
+        file_path (str): Path to JSON file
+        
+    Returns:
+        Parsed JSON data
+    
+    Raises:
+        json.JSONDecodeError: If the file does not contain valid JSON
+    """
+    # Both decoders accept UTF-8 bytes directly, so skip the text-mode decoding layer
+    with open(file_path, 'rb', buffering=_JSON_IO_BUFFER_SIZE) as f:
+        data = f.read()
+    
+    # orjson turns integers beyond 64 bits into floats, so any long digit run (even one
+    # inside a string) sends the document to the json module
+    if orjson is not None and _LONG_DIGIT_RUN_RE.search(data) is None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Also raised for NaN, Infinity and out-of-range numbers, which json accepts;
+            # genuinely invalid JSON gets raised again by json.loads below
+            pass
+    
+    return json.loads(data)
+
+def write_json_file(data, file_path):
+    """
+    Write data to a JSON file indented by 2 spaces.
+    
+    This always uses the json module, so files match the CLI's stdout output; orjson
+    would write NaN as null and reject integers beyond 64 bits.
+    
+    Args:
+        data: JSON-serializable data to write
+        file_path (str): Path to output file
+    """
+    with open(file_path, 'w', buffering=_JSON_IO_BUFFER_SIZE) as f:
+        json.dump(data, f, indent=2)
+
+def worker_count(task_count):
+    """
+    Get the number of threads to use for processing one subfolder per task.
+    
+    Subfolders are independent of each other, which is why get-state and get-drift
+    process them concurrently. The threads only wait on file operations or child
+    (cartography) processes, so the count is not tied to the CPU count, but it is
+    capped to avoid starting too many threads and processes at once.
+    
+    Args:
+        task_count (int): Number of subfolders to process
+        
+    Returns:
+        int: Number of worker threads, at least 1
+    """
+    return max(1, min(_MAX_WORKER_THREADS, task_count))
 
 def run_command(command):
     """
@@ -46,24 +262,38 @@ def run_command(command):
         bool: True if command succeeded, False otherwise
     """
     try:
-        logger.debug(f"Running command: {' '.join(command)}")
+        # stdout is only ever logged at DEBUG level, so discard it when that level is
+        # disabled; stderr is kept for error reporting
+        log_output = logger.isEnabledFor(logging.DEBUG)
+        
+        if log_output:
+            logger.debug("Running command: %s", " ".join(command))
         
-        # Run the command and capture output
-        result = subprocess.run(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=True
-        )
+        # stderr goes to a temporary file rather than a pipe so that a chatty stderr
+        # cannot fill the pipe and block the child while stdout is being streamed
+        with tempfile.TemporaryFile(mode="w+") as stderr_file:
+            with subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE if log_output else subprocess.DEVNULL,
+                stderr=stderr_file,
+                text=True,
+                bufsize=1
+            ) as process:
+                # Log output line by line as it is produced instead of buffering all of it
+                if log_output:
+                    for line in process.stdout:
+                        logger.debug("Command output: %s", line.rstrip())
+            
+            if process.returncode != 0:
+                stderr_file.seek(0)
+                raise subprocess.CalledProcessError(process.returncode, command, stderr=stderr_file.read())
         
-        logger.debug(f"Command output: {result.stdout}")
         return True
     
     except subprocess.CalledProcessError as e:
-        logger.error(f"Command failed with exit code {e.returncode}: {e.stderr}")
+        logger.error("Command failed with exit code %d: %s", e.returncode, e.stderr)
         return False
     
     except Exception as e:
-        logger.error(f"Error executing command: {str(e)}")
+        logger.error("Error executing command: %s", e)
         return False
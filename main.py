@@ -5,9 +5,8 @@ Provides both CLI and web interface functionality.
 """
 import sys
 import os
-import json
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, request, jsonify
 from drift_detector.cli import main as cli_main
 from drift_detector.get_state import run_get_state
 from drift_detector.get_drift import run_get_drift
@@ -27,10 +26,8 @@ last_results = {
     "timestamp": None
 }
 
-@app.route("/")
-def index():
-    """Main page that provides interface to CLI commands."""
-    return """
+# The index page is static, so encode it once at import time instead of on every request
+INDEX_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -95,6 +92,12 @@ def index():
     </body>
     </html>
     """
+_INDEX_HTML_BYTES = INDEX_HTML.encode("utf-8")
+
+@app.route("/")
+def index():
+    """Main page that provides interface to CLI commands."""
+    return Response(_INDEX_HTML_BYTES, mimetype="text/html")
 
 @app.route("/run-get-state", methods=["POST"])
 def run_get_state_web():